@@ -0,0 +1,346 @@
+#!/usr/bin/python3
+# coding: utf-8
+
+# Written by Manuel Pégourié-Gonnard, 2019. WTFPL v2.
+
+"""Check implementations against straightforward reference ones."""
+
+import argparse
+import concurrent.futures
+import functools
+import itertools
+import random
+
+from scales import Scale, ScaleFingering, Note, Mode, Context
+
+
+def ref_sorted(scale, right_hand):
+    """Return acceptable fingerings sorted by comparing criteria one by one.
+
+    This is the reference for both order and Pareto front, independent from
+    ScaleFingering.criteria_vector().
+    """
+    def cmp(f, g):
+        for name, d in ScaleFingering.criteria:
+            s = getattr(f, name)() * d
+            o = getattr(g, name)() * d
+            if s != o:
+                return -1 if s > o else 1
+        return 0
+
+    fs = ScaleFingering.each(scale.maps[right_hand])
+    return sorted((f for f in fs if f.is_acceptable()),
+                  key=functools.cmp_to_key(cmp))
+
+
+def ref_order(scale, right_hand):
+    """Return acceptable fingerings, most preferred first (reference)."""
+    return [str(f) for f in ref_sorted(scale, right_hand)]
+
+
+def fast_order(scale, right_hand):
+    """Return acceptable fingerings from Scale.fingerings()."""
+    return [str(f) for f in scale.fingerings(right_hand=right_hand)]
+
+
+def ref_pareto(scale, right_hand):
+    """Return non-dominated fingerings by pairwise comparisons (reference)."""
+    def at_least(f, g):
+        return all(getattr(f, name)() * d >= getattr(g, name)() * d
+                   for name, d in ScaleFingering.criteria)
+
+    fs = ref_sorted(scale, right_hand)
+    return [str(f) for f in fs
+            if not any(at_least(g, f) and not at_least(f, g) for g in fs)]
+
+
+def fast_pareto(scale, right_hand):
+    """Return non-dominated fingerings from pareto_fingerings()."""
+    return [str(f) for f, _ in scale.pareto_fingerings(right_hand=right_hand)]
+
+
+def ref_spellings(scale, right_hand):
+    """Return the spellings of the scale, computed directly (reference).
+
+    The tonic is spelled from the white key with the same rank, or else
+    from the two white keys next to it; then each note takes the next
+    letter. Prefer spellings with the least number of notes that have more
+    than one alteration, then the least number of altered notes.
+    """
+    if scale.tonic.rank in Note.white_keys:
+        bases = [scale.tonic.rank]
+    else:
+        bases = [scale.tonic.rank - 1, scale.tonic.rank + 1]
+
+    candidates = []
+    for base in bases:
+        letter = Note.white_keys.index(base)
+        names = []
+        nb_bad = nb_alt = 0
+        for note in scale.notes[:7]:
+            white = Note.white_keys[letter % 7]
+            distance = (note.rank - white + 6) % 12 - 6
+            if distance > 0:
+                name = Note.white_names[white] + Note.sharp_sym * distance
+            else:
+                name = Note.white_names[white] + Note.flat_sym * -distance
+            names.append(Note.substitutions.get(name, name))
+            nb_bad += abs(distance) > 1
+            nb_alt += distance != 0
+            letter += 1
+        candidates.append(((nb_bad, nb_alt), tuple(names)))
+
+    best = min(badness for badness, _ in candidates)
+    return [names for badness, names in candidates if badness == best]
+
+
+def fast_spellings(scale, right_hand):
+    """Return the spellings from Scale.spellings()."""
+    return scale.spellings()
+
+
+def ref_groups(scale, right_hand):
+    """Return the groups of each fingering, from displayed fingers (ref)."""
+    # group 2: 4th finger on A♯/B♭ (right hand) or F♯/G♭ (left hand),
+    # as in F♯ Major
+    fourth_wanted = 10 if right_hand else 6
+    groups = []
+    for f in ScaleFingering.each(scale.maps[right_hand]):
+        fingers = str(f)
+        g1 = fingers == ('12312345' if right_hand else '54321321')
+        g2 = scale.notes[fingers.index('4')].rank == fourth_wanted
+        groups.append(tuple(g for g, ok in ((1, g1), (2, g2),
+                                            (3, not (g1 or g2))) if ok))
+    return groups
+
+
+def fast_groups(scale, right_hand):
+    """Return the groups of each fingering from ScaleFingering.groups()."""
+    return [f.groups() for f in ScaleFingering.each(scale.maps[right_hand])]
+
+
+# pairs of (reference, checked) implementations to compare, by name
+# each is called with a scale and hand and returns a comparable value
+engines = {
+        'order': (ref_order, fast_order),
+        'pareto': (ref_pareto, fast_pareto),
+        'spellings': (ref_spellings, fast_spellings),
+        'groups': (ref_groups, fast_groups),
+}
+
+
+def diverges(case, name):
+    """Return (reference, checked) results if they differ, else None.
+
+    A case is a tuple (tonic rank, mode intervals, right hand).
+    """
+    rank, intervals, right_hand = case
+    scale = Scale(Note(rank), Mode.custom(intervals))
+    ref, checked = engines[name]
+    expected = ref(scale, right_hand)
+    got = checked(scale, right_hand)
+    return None if expected == got else (expected, got)
+
+
+def check_batch(cases):
+    """Return the first divergence as (case, engine name), or None."""
+    for case in cases:
+        for name in engines:
+            if diverges(case, name) is not None:
+                return case, name
+
+    return None
+
+
+def more_even(intervals):
+    """Iterate over modes with one half-step moved to even the intervals."""
+    for i, j in itertools.permutations(range(7), 2):
+        if intervals[i] > intervals[j] + 1:
+            moved = list(intervals)
+            moved[i] -= 1
+            moved[j] += 1
+            yield tuple(moved)
+
+
+def minimize(case, name):
+    """Return a simpler case that still diverges.
+
+    Prefer a registered mode, or else move half-steps between intervals
+    while it still diverges, to get closer to evenly spaced notes (this
+    always ends, as the sum of squared intervals decreases); then take the
+    lowest tonic and prefer the right hand.
+    """
+    rank, intervals, right_hand = case
+
+    registered = [m.intervals for m in Mode.each()]
+    for simpler in registered:
+        if diverges((rank, simpler, right_hand), name) is not None:
+            intervals = simpler
+            break
+    else:
+        progress = True
+        while progress:
+            progress = False
+            for simpler in more_even(intervals):
+                if diverges((rank, simpler, right_hand), name) is not None:
+                    intervals = simpler
+                    progress = True
+                    break
+
+    for r in range(rank + 1):
+        for rh in (True, False):
+            simpler = (r, intervals, rh)
+            if diverges(simpler, name) is not None:
+                return simpler
+
+    return (rank, intervals, right_hand)
+
+
+def check_contexts(cases, threads):
+    """Run contexts from many threads at once, return first problem or None.
+
+    Checks cached fingerings against the reference, random draws against
+    the same context used from a single thread, and names against known
+    ones.
+    """
+    shared = Context(seed=0)
+    scales = [Scale(Note(rank), Mode.custom(m)) for rank, m, _ in cases]
+    for right_hand in (False, True):
+        # go over the scales twice so that threads race on the cache
+        got = shared.fingerings_batch(scales * 2, right_hand=right_hand,
+                                      max_workers=threads)
+        for scale, fs in zip(scales * 2, got):
+            if [str(f) for f in fs] != ref_order(scale, right_hand):
+                return 'cached fingerings differ for {} {} ({})'.format(
+                        scale.tonic, scale.mode, 'RH' if right_hand else 'LH')
+
+    # same seed: the draws are shared between threads in some order,
+    # but all together they must be the same as from a single thread
+    nb_draws = 200
+    nb_modes = len(Mode.intervals_list)
+    sequential = Context(seed=1)
+    expected = sorted(s.tonic.rank * nb_modes + s.mode.index
+                      for s in (sequential.random_scale()
+                                for _ in range(threads * nb_draws)))
+    concurrent_ctx = Context(seed=1)
+
+    def draw(_):
+        scales = (concurrent_ctx.random_scale() for _ in range(nb_draws))
+        return [s.tonic.rank * nb_modes + s.mode.index for s in scales]
+
+    with concurrent.futures.ThreadPoolExecutor(threads) as executor:
+        got = sorted(d for ds in executor.map(draw, range(threads))
+                     for d in ds)
+    if got != expected:
+        return 'random draws differ between single and multiple threads'
+
+    # contexts with different locales give the expected names, including
+    # for custom modes and modes added after the locales were made, while
+    # used from many threads at the same time
+    custom = Mode.custom((1, 1, 1, 1, 1, 1, 6))
+    registered = Mode.intervals_list, Mode.names
+    Mode.intervals_list += ((2, 1, 2, 2, 1, 2, 2), )
+    Mode.names += ('Naturel', )
+    try:
+        added = Mode(len(Mode.names) - 1)
+    finally:
+        Mode.intervals_list, Mode.names = registered
+
+    default = (Note.note_names[0] + ' ' + Mode.names[0],
+               Note.note_names[6] + ' ' + Mode.names[1])
+    expected_names = {
+            'en': ('C Major', 'B Minor', 'B♭ Major', 'D♭ Major',
+                   'C 1111116', 'A♯ 1111116', 'F♯ Major', 'A Naturel'),
+            'de': ('C dur', 'H moll', 'B dur', 'D♭ dur',
+                   'C 1111116', 'A♯ 1111116', 'F♯ dur', 'A Naturel'),
+            'default': default,
+    }
+    named = (Scale(Note(0), Mode(0)), Scale(Note(11), Mode(1)),
+             Scale(Note(10), Mode(0)), Scale(Note(1), Mode(0)),
+             Scale(Note(0), custom), Scale(Note(10), custom),
+             Scale(Note(6), Mode(0)), Scale(Note(9), added))
+
+    def names(locale):
+        context = Context(locale=locale)
+        nb_expected = len(expected_names[locale])
+        return [tuple(context.name(s) for s in named[:nb_expected])
+                for _ in range(50)]
+
+    locales = list(expected_names) * threads
+    with concurrent.futures.ThreadPoolExecutor(threads) as executor:
+        for locale, got in zip(locales, executor.map(names, locales)):
+            if any(g != expected_names[locale] for g in got):
+                return 'unexpected names for locale ' + locale
+
+    return None
+
+
+def main():
+    """Generate cases, check them in parallel, report first divergence."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-a', '--all',
+                        help='check every scale of every generated mode',
+                        action='store_true')
+    parser.add_argument('-n', '--number',
+                        help='number of random scales to check (default 2000)',
+                        type=int, default=2000)
+    parser.add_argument('-s', '--seed',
+                        help='seed for choosing random scales (default 0)',
+                        type=int, default=0)
+    parser.add_argument('-j', '--jobs',
+                        help='number of worker processes (default: all CPUs)',
+                        type=int, default=None)
+    parser.add_argument('-t', '--threads',
+                        help='number of threads using contexts concurrently \
+                        (default 8, 0 to skip this check)',
+                        type=int, default=8)
+    args = parser.parse_args()
+
+    # registered modes always come first, then generated ones
+    modes = [m.intervals for m in Mode.each()]
+    modes += [m.intervals for m in Mode.each_generated()]
+    if args.all:
+        scales = [(n.rank, m) for m in modes for n in Note.each()]
+    else:
+        rng = random.Random(args.seed)
+        scales = [(n.rank, m) for m in modes[:2] for n in Note.each()]
+        scales += [(rng.randrange(12), rng.choice(modes))
+                   for _ in range(args.number)]
+
+    cases = [(rank, m, rh) for rank, m in scales for rh in (False, True)]
+    batch_size = 200
+    batches = [cases[i:i + batch_size]
+               for i in range(0, len(cases), batch_size)]
+
+    # map() returns results in order, so the first divergence found is
+    # deterministic for a given seed regardless of the number of jobs
+    with concurrent.futures.ProcessPoolExecutor(args.jobs) as executor:
+        for found in executor.map(check_batch, batches):
+            if found is not None:
+                break
+
+    if found is None and args.threads:
+        problem = check_contexts(cases, args.threads)
+        if problem is not None:
+            print('contexts:', problem)
+            return 1
+
+    if found is None:
+        print('OK: {} cases, engines: {}'.format(len(cases),
+                                                 ', '.join(engines)))
+        return 0
+
+    name = found[1]
+    rank, intervals, right_hand = minimize(*found)
+    expected, got = diverges((rank, intervals, right_hand), name)
+    print('divergence in', name, 'engine')
+    print('tonic:', Note(rank), '({})'.format(rank))
+    print('intervals:', ' '.join(str(i) for i in intervals))
+    print('hand:', 'right' if right_hand else 'left')
+    print('reference:', ' '.join(str(x) for x in expected))
+    print('checked:  ', ' '.join(str(x) for x in got))
+    return 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,135 @@
+#!/usr/bin/python3
+# coding: utf-8
+
+# Written by Manuel Pégourié-Gonnard, 2019. WTFPL v2.
+
+"""Check that the result store only recomputes what changed."""
+
+import os
+import sys
+import tempfile
+
+from scales import Scale, ScaleFingering, Mode, ResultStore
+
+
+def check(condition, message):
+    """Exit with an error message if condition is false."""
+    if not condition:
+        print('store:', message)
+        sys.exit(1)
+
+
+def stages_by_mode(changes):
+    """Return a dict of sets of stages changed, by mode intervals."""
+    stages = dict()
+    for key, stage, _, _ in changes:
+        intervals = key.split()[1]
+        stages.setdefault(intervals, set()).add(stage)
+    return stages
+
+
+# one result per scale, hand and stage
+nb_results = len(Mode.intervals_list) * 12 * 2 * 2
+
+store = ResultStore()
+changes = store.update(Scale.each())
+check(len(changes) == nb_results, 'first update should compute everything')
+
+changes = store.update(Scale.each())
+check(changes == [], 'second update should recompute nothing')
+
+# results survive saving and loading
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, 'store.json')
+    store.save(path)
+    changes = ResultStore.load(path).update(Scale.each())
+    check(changes == [], 'update after loading should recompute nothing')
+
+
+# docstrings and comments are not part of fingerprints, code is
+def documented():
+    """Return a function that is documented."""
+    def f(x):
+        """Return x, documented."""
+        return x  # comment
+    return f
+
+
+def other_doc():
+    """Return the same function with another docstring."""
+    def f(x):
+        """Return x, with another docstring."""
+        return x
+    return f
+
+
+def other_code():
+    """Return the same function with other code."""
+    def f(x):
+        """Return x, documented."""
+        return -x
+    return f
+
+
+check(ResultStore.fingerprint(documented()) ==
+      ResultStore.fingerprint(other_doc()),
+      'docstrings and comments should not change fingerprints')
+check(ResultStore.fingerprint(documented()) !=
+      ResultStore.fingerprint(other_code()),
+      'code should change fingerprints')
+
+# changing the intervals of one mode only touches that mode's results
+registered = Mode.intervals_list
+minor = registered[1]
+natural = (2, 1, 2, 2, 1, 2, 2)
+Mode.intervals_list = registered[:1] + (natural, ) + registered[2:]
+try:
+    stages = stages_by_mode(store.update(Scale.each()))
+finally:
+    Mode.intervals_list = registered
+
+touched = set(''.join(str(i) for i in m) for m in (minor, natural))
+check(set(stages) == touched,
+      'changing a mode should only touch results of old and new intervals')
+
+changes = store.update(Scale.each())
+# 12 tonics, 2 hands, 2 stages, for old and new intervals
+check(len(changes) == 12 * 2 * 2 * 2 and
+      set(stages_by_mode(changes)) == touched,
+      'restoring a mode should only touch results of old and new intervals')
+
+# changing the criteria only recomputes fingerings
+criteria = ScaleFingering.criteria
+ScaleFingering.criteria = criteria[:2] + criteria[:1:-1]
+try:
+    changes = store.update(Scale.each())
+finally:
+    ScaleFingering.criteria = criteria
+
+check(len(changes) == nb_results // 2 and
+      all(stage == 'fingerings' for _, stage, _, _ in changes),
+      'changing criteria should only recompute fingerings')
+
+
+# changing how fingerings are sorted recomputes all of them
+def fingerings_worst_first(self, *, right_hand):
+    """Return a tuple of acceptable fingers with least preferred first."""
+    fs = ScaleFingering.each(self.maps[right_hand])
+    return tuple(sorted((f for f in fs if f.is_acceptable()),
+                        key=ScaleFingering.criteria_vector))
+
+
+# start from results up to date with the actual criteria
+store.update(Scale.each())
+fingerings = Scale.fingerings
+Scale.fingerings = fingerings_worst_first
+try:
+    changes = store.update(Scale.each())
+finally:
+    Scale.fingerings = fingerings
+
+check(len(changes) == nb_results // 2 and
+      all(stage == 'fingerings' for _, stage, _, _ in changes),
+      'changing how fingerings are sorted should recompute them all')
+
+print('OK: store recomputes only what changed')
@@ -0,0 +1,90 @@
+#!/usr/bin/python3
+# coding: utf-8
+
+# Written by Manuel Pégourié-Gonnard, 2019. WTFPL v2.
+
+"""Print the Pareto-optimal fingerings of each scale for all criteria."""
+
+import argparse
+
+from scales import Scale, ScaleFingering, Note, Mode
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument('-c', '--chromatic',
+                    help='sort chromatically rather than by circle-of-fifths',
+                    action='store_true')
+parser.add_argument('-m', '--modes',
+                    help='print scales in this/these mode(s)',
+                    choices=('major', 'minor', 'both'),
+                    default='both',
+                    action='store')
+parser.add_argument('-g', '--generated',
+                    help='use all generated 7-notes modes (ignores -m)',
+                    action='store_true')
+parser.add_argument('-H', '--hands',
+                    help='print fingerings for this/these hand(s)',
+                    choices=('left', 'right', 'both'),
+                    default='both',
+                    action='store')
+args = parser.parse_args()
+
+allowed_modes = {
+        'major': (0, ),
+        'minor': (1, ),
+        'both': (0, 1),
+}
+
+allowed_hands = {
+        'left': (False, ),
+        'right': (True, ),
+        'both': (False, True),
+}
+
+hand_names = {
+        False: 'LH',
+        True: 'RH',
+}
+
+
+def wins(vector, front):
+    """Return the names of criteria on which this vector is the best.
+
+    Members of the front that are not the best on any criterion are either
+    tied with another member (same vector) or a compromise between others.
+    """
+    names = []
+    for i, (name, _) in enumerate(ScaleFingering.criteria):
+        values = set(v[i] for _, v in front)
+        if len(values) > 1 and vector[i] == max(values):
+            names.append(name)
+
+    if names:
+        return ', '.join(names)
+    if sum(1 for _, v in front if v == vector) > 1:
+        return 'tie'
+    return 'compromise'
+
+
+# names of generated modes are their intervals, longer than Majeur/Mineur
+width = 13 if args.generated else 10
+
+if args.generated:
+    stride = 1 if args.chromatic else 7
+    scales = (Scale(note, mode)
+              for mode in Mode.each_generated()
+              for note in Note.each(stride))
+else:
+    scales = (scale for scale in Scale.each(not args.chromatic)
+              if scale.mode.index in allowed_modes[args.modes])
+
+for scale in scales:
+    for right_hand in allowed_hands[args.hands]:
+        front = scale.pareto_fingerings(right_hand=right_hand)
+        if len(front) == 1:
+            annotated = [str(front[0][0]) + ' (dominant)']
+        else:
+            annotated = [str(f) + ' (' + wins(v, front) + ')'
+                         for f, v in front]
+
+        print(str(scale).ljust(width), hand_names[right_hand],
+              ' / '.join(annotated))
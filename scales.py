@@ -7,12 +7,24 @@ Tools for exploring the scales and their fingering at the piano.
 
 Classes:
     - Note: one of the 12 notes.
-    - Mode: major or minor (harmonic).
+    - Mode: major or minor (harmonic), or custom intervals.
     - ScaleFingering: a fingering of a scale.
     - Scale: a scale, defined by tonic and mode.
+    - Locale: names of notes and modes in a naming system.
+    - Context: state for using this module from concurrent callers.
+    - ResultStore: computed fingerings, recomputed when their inputs change.
 """
 
+import ast
+import concurrent.futures
+import hashlib
+import inspect
+import itertools
+import json
 import random
+import textwrap
+import threading
+import types
 
 
 class Note:
@@ -83,13 +95,26 @@ class Note:
                 return (prv, cur)
             prv = cur
 
-    def name_with_base_white(self, base_white):
-        """Return our name by adding alterations to the given base."""
-        base_name = self.white_names[base_white]
+    def alteration(self, base_white):
+        """Return the number of half-steps from the given base to us.
 
+        Positive for sharps, negative for flats, between -6 and 5.
+        """
         distance = (self.rank - base_white) % 12
         if distance >= 6:
             distance -= 12
+        return distance
+
+    def name_with_base_white(self, base_white, locale=None):
+        """Return our name by adding alterations to the given base.
+
+        Names are taken from the locale (a Locale object) if given,
+        otherwise from the class attributes.
+        """
+        names = self if locale is None else locale
+        base_name = names.white_names[base_white]
+
+        distance = self.alteration(base_white)
 
         if distance > 0:
             alter = self.sharp_sym * distance
@@ -101,8 +126,8 @@ class Note:
         full_name = base_name + alter
 
         # support for "B" in the German system
-        if full_name in self.substitutions:
-            full_name = self.substitutions[full_name]
+        if full_name in names.substitutions:
+            full_name = names.substitutions[full_name]
 
         return full_name
 
@@ -143,6 +168,29 @@ class Mode:
         """Return a mode chosen at random."""
         return Mode(random.randrange(len(cls.intervals_list)))
 
+    @staticmethod
+    def each_generated():
+        """Iterate over all 7-notes modes, registered or not.
+
+        That is, all ways of splitting the octave in 7 intervals, see custom().
+        """
+        for cuts in itertools.combinations(range(1, 12), 6):
+            bounds = (0, ) + cuts + (12, )
+            yield Mode.custom(b - a for a, b in zip(bounds, bounds[1:]))
+
+    @classmethod
+    def custom(cls, intervals):
+        """Create a mode given by its intervals (7 half-steps counts).
+
+        The intervals don't need to be in intervals_list; the mode is named
+        after them and has no index.
+        """
+        mode = cls.__new__(cls)
+        mode.intervals = tuple(intervals)
+        mode.name = ''.join(str(i) for i in mode.intervals)
+        mode.index = None
+        return mode
+
     def __init__(self, index):
         """Create a mode given by its index: 0 = Major, 1 = Minor harmonic."""
         self.intervals = self.intervals_list[index]
@@ -266,6 +314,26 @@ class ScaleFingering:
         """Return the number of times passing the thumb after a black key."""
         return sum(1 for s in self.thumb_scores if s[1] == 1)
 
+    # criteria used to rank fingerings, most important first, as pairs of
+    # method name and desirability (+1 if more is better, -1 otherwise)
+    #
+    # they were chosen to prefer the standard fingering for each of the 24
+    # major and minor (harmonic) scales for both hands
+    criteria = (
+            ('ends_with_pinky',     +1),
+            ('starts_with_thumb',   +1),
+            ('has_no_long_passing', +1),
+            ('nb_black_passings',   +1),
+    )
+
+    def criteria_vector(self):
+        """Return a tuple of criteria values oriented so that more is better.
+
+        Comparing two vectors lexicographically is equivalent to compare().
+        """
+        return tuple(int(getattr(self, name)()) * desirability
+                     for name, desirability in self.criteria)
+
     def compare(self, other):
         """Compare to another fingering and return preference code and reason.
 
@@ -276,18 +344,7 @@ class ScaleFingering:
 
         The reason (str) represents the differentiating criterion.
         """
-        # this function was designed to prefer the standard fingering
-        # for each of the 24 major and minor (harmonic) scales for both hands
-        #
-        # we use the following list of desirable criteria:
-        criteria = (
-                ('ends_with_pinky',     +1),
-                ('starts_with_thumb',   +1),
-                ('has_no_long_passing', +1),
-                ('nb_black_passings',   +1),
-        )
-
-        for name, desirability in criteria:
+        for name, desirability in self.criteria:
             s = getattr(self, name)()
             o = getattr(other, name)()
 
@@ -297,6 +354,33 @@ class ScaleFingering:
 
         return 0, ''
 
+    @staticmethod
+    def dominates(vector, other):
+        """Tell if a criteria vector is Pareto-better than another one.
+
+        That is, at least as good on each criterion and better on one.
+        """
+        return vector != other and all(v >= o for v, o in zip(vector, other))
+
+    @staticmethod
+    def pareto_front(fingerings):
+        """Return the non-dominated fingerings, most preferred first.
+
+        Each fingering is returned as a pair (fingering, criteria vector).
+        """
+        # Sorting by decreasing vectors ensures that a vector can only be
+        # dominated by vectors that come before it, and if it is dominated,
+        # then it is also dominated by a member of the front (transitivity).
+        # So each vector only needs to be checked against the front so far.
+        scored = sorted(((f, f.criteria_vector()) for f in fingerings),
+                        key=lambda p: p[1], reverse=True)
+        front = []
+        for f, vector in scored:
+            if not any(ScaleFingering.dominates(v, vector) for _, v in front):
+                front.append((f, vector))
+
+        return tuple(front)
+
     def __lt__(self, other):
         """Return True if self is preferred to other."""
         # define "less than" as "preferred" so that sorting
@@ -380,45 +464,79 @@ class Scale:
         random.shuffle(scales)
         return scales
 
-    def spellings(self):
+    def spellings(self, locale=None):
         """Return a one or two-element list of 7-tuples with note names.
 
         Choose the spelling with no double-sharps or double-flats, and the
         least number of sharps/flats in the note names, and return both in
         case of equality.
+
+        Some custom modes can't be spelled without double (or more)
+        alterations; for them, choose the spellings with the least number of
+        such notes first. So the list is never empty.
+
+        See Note.name_with_base_white() for the locale.
         """
         scale_candidates = []
-        nb_alt_prev = 7
+        best = None
         for tonic_base in self.tonic.closest_white_keys():
             note_names = []
-            bad = False
+            nb_bad = 0
             nb_alt = 0
             for i, cur_base in enumerate(Note.whites_from(tonic_base)):
                 cur_note = self.notes[i]
-                name = cur_note.name_with_base_white(cur_base)
+                name = cur_note.name_with_base_white(cur_base, locale)
                 note_names.append(name)
 
-                if Note.sharp_sym in name or Note.flat_sym in name:
+                # count on alterations rather than names, as substitutions
+                # (eg H♭ -> B) would make the choice depend on the locale
+                distance = cur_note.alteration(cur_base)
+                if distance != 0:
                     nb_alt += 1
-                if Note.sharp_sym * 2 in name or Note.flat_sym * 2 in name:
-                    bad = True
+                if abs(distance) > 1:
+                    nb_bad += 1
 
-            if not bad:
-                if nb_alt < nb_alt_prev:
-                    scale_candidates = []
+            if best is None or (nb_bad, nb_alt) < best:
+                scale_candidates = []
+                best = (nb_bad, nb_alt)
+            if (nb_bad, nb_alt) == best:
                 scale_candidates.append(tuple(note_names))
-                nb_alt_prev = nb_alt
 
         return scale_candidates
 
+    def name(self, locale=None):
+        """Return the name of the scale (tonic + mode) in the given locale.
+
+        This works for custom modes too, as spellings() is never empty.
+        """
+        if locale is None:
+            mode_name = str(self.mode)
+        else:
+            mode_name = locale.mode_name(self.mode)
+
+        return self.spellings(locale)[0][0] + ' ' + mode_name
+
     def __str__(self):
         """Return the name of the scale (tonic + mode) as a string."""
-        return self.spellings()[0][0] + ' ' + str(self.mode)
+        return self.name()
 
     def fingerings(self, *, right_hand):
         """Return a tuple of acceptable fingers with most preferred first."""
+        # sorting by criteria vectors computes each of them only once,
+        # and gives the same order as sorting with compare()
         fs = ScaleFingering.each(self.maps[right_hand])
-        return tuple(sorted(f for f in fs if f.is_acceptable()))
+        return tuple(sorted((f for f in fs if f.is_acceptable()),
+                            key=ScaleFingering.criteria_vector, reverse=True))
+
+    def pareto_fingerings(self, *, right_hand):
+        """Return acceptable fingerings that are not dominated by another one.
+
+        A fingering dominates another if it's at least as good for each of
+        the criteria in ScaleFingering.criteria and better for one of them.
+        See ScaleFingering.pareto_front() for the format.
+        """
+        fs = ScaleFingering.each(self.maps[right_hand])
+        return ScaleFingering.pareto_front(f for f in fs if f.is_acceptable())
 
     def thumb_scores(self, *, right_hand):
         """Return a tuple of thumb scores associated with each note.
@@ -429,3 +547,280 @@ class Scale:
         """
         m = self.maps[right_hand]
         return m.symmetry(m.scores)
+
+
+class Locale:
+    """Names of notes and modes in a naming system (French, English...).
+
+    Members are read-only once created, so a locale can be shared between
+    threads. The class attributes of Note and Mode act as the default locale.
+    """
+
+    def __init__(self, note_names, mode_names, substitutions=None):
+        """Create a locale from names of white keys and of modes."""
+        self.note_names = tuple(note_names)
+        self.mode_names = tuple(mode_names)
+        self.substitutions = types.MappingProxyType(dict(substitutions or {}))
+        self.white_names = types.MappingProxyType(
+                dict(zip(Note.white_keys, self.note_names)))
+
+    def mode_name(self, mode):
+        """Return the name of the given mode.
+
+        Custom modes, and modes added to Mode.names after this locale was
+        made, keep their own name.
+        """
+        if mode.index is None or mode.index >= len(self.mode_names):
+            return mode.name
+
+        return self.mode_names[mode.index]
+
+
+class Context:
+    """State for using this module from concurrent callers.
+
+    The rest of this module keeps its state in shared places: the random
+    module singleton, and class attributes used as configuration. A context
+    has its own random generator, locale and cache of fingerings, and only
+    reads the class attributes and the locales table, which must not be
+    modified while contexts are in use.
+
+    All methods are safe to call concurrently on the same context. For
+    reproducible random sequences, give each thread its own seeded context.
+    """
+
+    # 'default' follows the class attributes (French unless edited)
+    locales = types.MappingProxyType({
+        'default': Locale(Note.note_names, Mode.names, Note.substitutions),
+        'en': Locale(('C', 'D', 'E', 'F', 'G', 'A', 'B'),
+                     ('Major', 'Minor')),
+        'de': Locale(('C', 'D', 'E', 'F', 'G', 'A', 'H'),
+                     ('dur', 'moll'), {'H♭': 'B'}),
+    })
+
+    def __init__(self, *, seed=None, locale=None):
+        """Create a context with a random seed and a locale name.
+
+        The locale is a key of locales, or None for 'default'.
+        """
+        self._random = random.Random(seed)
+        self.locale = self.locales['default' if locale is None else locale]
+        self._lock = threading.Lock()
+        self._fingerings = {}
+
+    def random_note(self):
+        """Return a note chosen at random."""
+        with self._lock:
+            return Note(self._random.randrange(12))
+
+    def random_mode(self):
+        """Return a mode chosen at random."""
+        with self._lock:
+            return Mode(self._random.randrange(len(Mode.intervals_list)))
+
+    def random_scale(self):
+        """Return a scale chosen at random."""
+        with self._lock:
+            rank = self._random.randrange(12)
+            index = self._random.randrange(len(Mode.intervals_list))
+
+        return Scale(Note(rank), Mode(index))
+
+    def all_random(self):
+        """Return a randomly shuffled list of all scales."""
+        scales = list(Scale.each(False))
+        with self._lock:
+            self._random.shuffle(scales)
+        return scales
+
+    def name(self, scale):
+        """Return the name of the scale in our locale."""
+        return scale.name(self.locale)
+
+    def spellings(self, scale):
+        """Return the spellings of the scale in our locale."""
+        return scale.spellings(self.locale)
+
+    def fingerings(self, scale, *, right_hand):
+        """Return acceptable fingerings, most preferred first, cached."""
+        key = (scale.tonic.rank, scale.mode.intervals, right_hand)
+        with self._lock:
+            cached = self._fingerings.get(key)
+
+        # compute outside the lock: at worst, two threads compute the same
+        # fingerings and the first one stored wins
+        if cached is None:
+            computed = scale.fingerings(right_hand=right_hand)
+            with self._lock:
+                cached = self._fingerings.setdefault(key, computed)
+
+        return cached
+
+    def fingerings_batch(self, scales, *, right_hand, max_workers=None):
+        """Return a list of fingerings() for each scale, using threads."""
+        def one(scale):
+            return self.fingerings(scale, right_hand=right_hand)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+            return list(executor.map(one, scales))
+
+
+class ResultStore:
+    """Computed results for each scale and hand, with what they depend on.
+
+    Results come from two stages:
+    - map: thumb scores (see ScaleThumbMap), which depend on the mode
+      definition and on the scoring rules. They're always computed along
+      with the Scale, so this stage saves no work: it records the scores so
+      that fingerings are only recomputed when the scores actually change;
+    - fingerings: acceptable fingerings, preferred first, which depend on the
+      map and on the criteria (see ScaleFingering.criteria) and the other
+      rules for listing them (see criteria_fingerprint()).
+
+    Each result records fingerprints of its inputs, so that update() only
+    recomputes results whose inputs changed. The store can be saved to and
+    loaded from a JSON file.
+    """
+
+    def __init__(self, data=None):
+        """Create a store, empty or from data previously saved."""
+        self.data = {} if data is None else data
+
+    @classmethod
+    def load(cls, path):
+        """Load a store from a JSON file, or create an empty one."""
+        try:
+            with open(path, encoding='utf-8') as f:
+                return cls(json.load(f))
+        except FileNotFoundError:
+            return cls()
+
+    def save(self, path):
+        """Save the store to a JSON file."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=1, sort_keys=True)
+
+    @staticmethod
+    def code(function):
+        """Return the code of a function without docstrings and comments."""
+        tree = ast.parse(textwrap.dedent(inspect.getsource(function)))
+        for node in ast.walk(tree):
+            body = getattr(node, 'body', None)
+            if (isinstance(body, list) and body and
+                    isinstance(body[0], ast.Expr) and
+                    isinstance(body[0].value, ast.Constant) and
+                    isinstance(body[0].value.value, str)):
+                node.body = body[1:]
+
+        return ast.dump(tree)
+
+    @classmethod
+    def fingerprint(cls, *parts):
+        """Return a short hash of the given parts (functions or values).
+
+        Functions are hashed by their code, see code().
+        """
+        h = hashlib.sha1()
+        for part in parts:
+            if callable(part):
+                part = cls.code(part)
+            h.update(repr(part).encode('utf-8'))
+        return h.hexdigest()[:16]
+
+    @classmethod
+    def scoring_fingerprint(cls):
+        """Return a fingerprint of the rules for computing thumb scores."""
+        return cls.fingerprint(Note.white_keys, Note.is_black,
+                               ScaleThumbMap.c_major_thumb,
+                               ScaleThumbMap.__init__, ScaleThumbMap.score)
+
+    @classmethod
+    def criteria_fingerprint(cls):
+        """Return a fingerprint of the rules for listing fingerings.
+
+        That's everything the stored fingerings depend on, apart from the map:
+        which fingerings exist and are acceptable, how they're sorted, and how
+        they're printed.
+        """
+        methods = (getattr(ScaleFingering, name)
+                   for name, _ in ScaleFingering.criteria)
+        return cls.fingerprint(ScaleFingering.base, ScaleFingering.criteria,
+                               ScaleFingering.__init__, ScaleFingering.each,
+                               ScaleFingering.is_acceptable,
+                               ScaleFingering.criteria_vector,
+                               ScaleFingering.__str__, ScaleThumbMap.__init__,
+                               Scale.fingerings, *methods)
+
+    @staticmethod
+    def key(scale, right_hand):
+        """Return the key of results for a scale and hand.
+
+        It's made of the tonic, the intervals of the mode and the hand, so
+        that custom modes get their own keys, and adding a mode to
+        Mode.intervals_list doesn't change the keys of other modes.
+        """
+        return '{} {} {}'.format(scale.tonic.rank,
+                                 ''.join(str(i) for i in scale.mode.intervals),
+                                 'RH' if right_hand else 'LH')
+
+    def _stage(self, key, stage, deps, compute, changes):
+        """Return the result of a stage, recomputing it if deps changed.
+
+        If recomputed, append (key, stage, old result, new result) to changes.
+        """
+        entries = self.data.setdefault(key, {})
+        entry = entries.get(stage)
+        if entry is not None and entry['deps'] == deps:
+            return entry['result']
+
+        # go through JSON so that results compare equal once reloaded
+        result = json.loads(json.dumps(compute()))
+        old = None if entry is None else entry['result']
+        entries[stage] = {'deps': deps, 'result': result}
+        changes.append((key, stage, old, result))
+        return result
+
+    def update(self, scales):
+        """Bring results for the given scales up to date for both hands.
+
+        Results for scales that are not given are removed, so scales should
+        include all the scales of interest (eg Scale.each()).
+
+        Return a list of (key, stage, old result, new result) for each result
+        that was recomputed; old result is None for new results, and new
+        result is None for removed ones.
+        """
+        scoring = self.scoring_fingerprint()
+        criteria = self.criteria_fingerprint()
+
+        changes = []
+        keys = set()
+        for scale in scales:
+            for right_hand in (False, True):
+                key = self.key(scale, right_hand)
+                keys.add(key)
+
+                def compute_map():
+                    return scale.maps[right_hand].scores
+
+                deps = {'scoring': scoring}
+                scores = self._stage(key, 'map', deps, compute_map, changes)
+
+                def compute_fingerings():
+                    fs = scale.fingerings(right_hand=right_hand)
+                    return [str(f) for f in fs]
+
+                deps = {'map': self.fingerprint(scores),
+                        'criteria': criteria}
+                self._stage(key, 'fingerings', deps, compute_fingerings,
+                            changes)
+
+        for key in sorted(set(self.data) - keys):
+            for stage, entry in self.data.pop(key).items():
+                changes.append((key, stage, entry['result'], None))
+
+        return changes
+
+    def fingerings(self, scale, *, right_hand):
+        """Return the stored results of a scale and hand, preferred first."""
+        return self.data[self.key(scale, right_hand)]['fingerings']['result']
@@ -12,3 +12,9 @@ pydocstyle *.py
 diff {my,ref}-scales-harmonic
 diff {my,ref}-scales-chromatic
 rm my-scales-{harmonic,chromatic}
+
+# compare fast implementations to reference ones
+./check-scales.py
+
+# check that the result store only recomputes what changed
+./check-store.py
@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+# coding: utf-8
+
+# Written by Manuel Pégourié-Gonnard, 2019. WTFPL v2.
+
+"""Recompute stored fingerings whose inputs changed, and compare to ref."""
+
+import argparse
+import difflib
+
+from scales import Scale, ResultStore
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument('-c', '--chromatic',
+                    help='sort chromatically rather than by circle-of-fifths \
+                    (and compare to ref-scales-chromatic)',
+                    action='store_true')
+parser.add_argument('-s', '--store',
+                    help='file for loading and saving results',
+                    default='.scales-store.json',
+                    action='store')
+parser.add_argument('-v', '--verbose',
+                    help='list all recomputed results, not just changed ones',
+                    action='store_true')
+args = parser.parse_args()
+
+store = ResultStore.load(args.store)
+scales = list(Scale.each(not args.chromatic))
+changes = store.update(scales)
+store.save(args.store)
+
+# what was recomputed, and what changed
+names = dict((ResultStore.key(s, rh), str(s) + (' RH' if rh else ' LH'))
+             for s in scales for rh in (False, True))
+counts = dict()
+for key, stage, old, new in changes:
+    counts[stage] = counts.get(stage, 0) + 1
+    if old == new and not args.verbose:
+        continue
+
+    # removed scales are no longer in names, show their key instead
+    name = names.get(key, key)
+    if stage == 'fingerings':
+        old = '(new)' if old is None else ' '.join(old)
+        new = '(removed)' if new is None else ' '.join(new)
+        print(name, stage + ':', old, '->', new)
+    elif old is None:
+        print(name, stage + ':', 'new')
+    elif new is None:
+        print(name, stage + ':', 'removed')
+    else:
+        print(name, stage + ':', 'changed')
+
+# map results are always available with the scale, they're only recorded
+print('map: {} updated, fingerings: {} recomputed'.format(
+        counts.get('map', 0), counts.get('fingerings', 0)))
+
+# compare with reference in the same format as all-scales.py
+ref_name = 'ref-scales-' + ('chromatic' if args.chromatic else 'harmonic')
+lines = [' '.join((str(s).ljust(10),
+                   store.fingerings(s, right_hand=False)[0],
+                   store.fingerings(s, right_hand=True)[0])) + '\n'
+         for s in scales]
+with open(ref_name, encoding='utf-8') as f:
+    ref_lines = f.readlines()
+
+diff = list(difflib.unified_diff(ref_lines, lines, ref_name, 'stored'))
+if diff:
+    print(''.join(diff), end='')
+else:
+    print('same as', ref_name)